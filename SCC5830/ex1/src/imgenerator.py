@@ -10,9 +10,8 @@ Image generator
     Image Processing Class (SCC5830)
 '''
 import os
-import random
 import numpy as np
-from math import sin, cos, pow, floor, sqrt
+from math import sqrt
 
 
 class IMGenerator():
@@ -41,80 +40,68 @@ class IMGenerator():
         '''
         Generates images
         '''
-        if self.f == 1:
-            return self.func_one()
-        if self.f == 2:
-            return self.func_two()
-        if self.f == 3:
-            return self.func_three()
-        if self.f == 4:
-            return self.func_four()
-        if self.f == 5:
-            return self.func_five()
+        funcs = (self.func_one, self.func_two, self.func_three, self.func_four, self.func_five)
+
+        return funcs[self.f - 1]()
 
     def func_one(self):
         '''
         Function 1: generates images from f(x,y) = (xy + 2x)
         '''
-        img = np.ones((self.C, self.C), dtype='float32')
+        x = np.arange(self.C, dtype='float32')[:, None]
+        y = np.arange(self.C, dtype='float32')[None, :]
+        img = x * y + 2 * y
 
-        for x in range(self.C):
-            for y in range(self.C):
-                img[x][y] = x * y + 2 * y
-        
         return self.quantitize(self.downsampling(self.normalize(img, 16)))
     
     def func_two(self):
         '''
-        Function 2: generates images from f(x,y) = |cos(x/Q + 2sin(y/Q)|
+        Function 2: generates images from f(x,y) = |cos(x/Q) + 2sin(y/Q)|
         '''
-        img = np.ones((self.C, self.C), dtype='float32')
-        
-        for x in range(self.C):
-            for y in range(self.C):
-                img[x][y] = abs(cos(x / self.Q) + 2 * sin(y / self.Q))
-                                
+        x = np.cos(np.arange(self.C, dtype='float32') / self.Q)
+        y = np.sin(np.arange(self.C, dtype='float32') / self.Q)
+        img = np.abs(x[:, None] + 2 * y[None, :])
+
         return self.quantitize(self.downsampling(self.normalize(img, 16)))
     
     def func_three(self):
         '''
         Function 3: generates images from f(x,y) = |3(x/Q) - (y/Q) ^ (1/3)|
         '''
-        img = np.ones((self.C, self.C), dtype='float32')
-        
-        for x in range(self.C):
-            for y in range(self.C):
-                img[x][y] = abs(3 * (x / self.Q) - pow(y/self.Q, 1/3))
-                                
+        x = 3 * np.arange(self.C, dtype='float32') / self.Q
+        y = np.cbrt(np.arange(self.C, dtype='float32') / self.Q)
+        img = np.abs(x[:, None] - y[None, :])
+
         return self.quantitize(self.downsampling(self.normalize(img, 16)))
     
     def func_four(self):
         '''
         Function 4: generates images from f(x,y) = random(0,1,S)
+
+        Note: uses numpy's PCG64 generator, so the random stream differs
+        from the previous random.random implementation
         '''
-        random.seed(self.B)
-        img = np.zeros((self.C, self.C), dtype='float32')
-        
-        for x in range(self.C):
-            for y in range(self.C):
-                img[x][y] = random.random()
-        
+        rng = np.random.default_rng(self.S)
+        img = rng.random((self.C, self.C), dtype=np.float32)
+
         return self.quantitize(self.downsampling(self.normalize(img, 16)))
     
     def func_five(self):
         '''
         Function 5: generates images from f(x,y) = randomwalk(S)
+
+        Note: uses numpy's PCG64 generator, so the random stream differs
+        from the previous random.randint implementation
         '''
-        random.seed(self.B)
+        rng = np.random.default_rng(self.S)
         img = np.zeros((self.C, self.C), dtype='float32')
-        
-        x = 0
-        y = 0
-        
-        for _ in range(floor((self.C * self.C + 1) / 2)):
-            img[x][y] = 1
-            x = (x + random.randint(-1,1)) % self.C
-            y = (y + random.randint(-1,1)) % self.C
+
+        steps = rng.integers(-1, 2, size=((self.C * self.C + 1) // 2, 2), dtype=np.int32)
+        steps[0] = 0
+
+        xs = np.cumsum(steps[:, 0]) % self.C
+        ys = np.cumsum(steps[:, 1]) % self.C
+        img[xs, ys] = 1
 
         return self.quantitize(self.downsampling(self.normalize(img, 16)))
     
@@ -127,8 +114,12 @@ class IMGenerator():
         '''
         imax = np.max(img)
         imin = np.min(img)
-        
-        return (img-imin)/(imax-imin) * (pow(2, B) - 1)  
+
+        scale = ((1 << B) - 1) / (imax - imin)
+        img = np.subtract(img, imin, dtype=np.float32)
+        img *= scale
+
+        return img
     
     def downsampling(self, img):
         '''
@@ -136,14 +127,10 @@ class IMGenerator():
         
         @param img: 2D numpy array to reduce dimensions
         '''
-        new_img = np.zeros((self.N, self.N))
+        r = self.C // self.N
+        idx = r * np.arange(self.N)
 
-        r = floor(self.C / self.N)
-        for x in range(0, self.N):
-            for y in range(0, self.N):
-                new_img[x][y] = img[x * r][y * r]
-            
-        return new_img
+        return img[idx[:, None], idx[None, :]]
 
     def quantitize(self, img):
         '''
@@ -152,10 +139,13 @@ class IMGenerator():
         @param img: 2D numpy array to reduce dimensions
         '''
         img = self.normalize(img, 8)
-        
-        for x in range(self.N):
-            for y in range(self.N):
-                img[x][y] = int(img[x][y]) >> (8 - self.B)
+
+        N = self.N
+        shift = 8 - self.B
+        for x in range(N):
+            row = img[x]
+            for y in range(N):
+                row[y] = int(row[y]) >> shift
 
         return self.normalize(img, 8).astype(np.uint8)
     
@@ -12,6 +12,61 @@ Image filtering
 import imageio
 import numpy as np
 from math import sqrt
+from scipy import ndimage
+from numba import njit, prange
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+@njit('uint8[:,:](uint8[:,:], int64)', parallel=True, cache=True, boundscheck=False)
+def _median_filter_u8(img, size):
+    '''
+    Median filter for uint8 images with a sliding 256-bin histogram
+
+    For each row the histogram of the first window is built once and then
+    updated in O(size) per pixel as the window slides right. Pixels outside
+    the image count as zeros, matching a zero-padded border.
+
+    @param img: 2D uint8 numpy array to filter
+    @param size: side of the square neighborhood
+    @return filtered 2D uint8 numpy array
+    '''
+    padding = size // 2
+    rank = (size * size - 1) // 2 + 1
+    new_img = np.zeros_like(img)
+
+    for i in prange(img.shape[0]):
+        r0 = max(i - padding, 0)
+        r1 = min(i + padding, img.shape[0] - 1)
+
+        hist = np.zeros(256, np.int32)
+        count = 0
+        for c in range(min(padding, img.shape[1] - 1) + 1):
+            for r in range(r0, r1 + 1):
+                hist[img[r, c]] += 1
+                count += 1
+
+        for j in range(img.shape[1]):
+            cum = size * size - count
+            value = 0
+            for v in range(256):
+                cum += hist[v]
+                if cum >= rank:
+                    value = v
+                    break
+            new_img[i, j] = value
+
+            c_out = j - padding
+            if c_out >= 0:
+                for r in range(r0, r1 + 1):
+                    hist[img[r, c_out]] -= 1
+                    count -= 1
+            c_in = j + padding + 1
+            if c_in < img.shape[1]:
+                for r in range(r0, r1 + 1):
+                    hist[img[r, c_in]] += 1
+                    count += 1
+
+    return new_img
 
 
 class FilterFactory:
@@ -48,7 +103,7 @@ class IMGFiltering:
         # large integers (to compute the multiplication). Hence, I am converting it to int32
         # instead of uint8
         
-        return ((img-imin)/(imax-imin) * (pow(2, 8) - 1)).astype(np.int32)
+        return ((img-imin)/(imax-imin) * 255).astype(np.int32)
     
     def calc_rmse(self, img1, img2):
         '''
@@ -58,7 +113,8 @@ class IMGFiltering:
         @param img2: 2D numpy array
         @return integer with RMSE value
         '''
-        mse = np.sum(np.multiply(img1 - img2, img1 - img2)) / (img1.shape[0] * img1.shape[1])
+        diff = np.subtract(img1, img2, dtype=np.int64).ravel()
+        mse = np.dot(diff, diff) / diff.size
         return round(sqrt(mse), 4)
 
     def find_optimum_threshold(self, img):
@@ -68,24 +124,22 @@ class IMGFiltering:
         @param img: image to check pixel values
         @return optimum value for the threshold
         '''
+        imin = int(np.min(img))
+        hist = np.bincount((img.ravel() - imin).astype(np.int64))
+
+        cum_count = np.cumsum(hist)
+        cum_sum = np.cumsum(hist * (np.arange(hist.size) + imin), dtype=np.float64)
+
         optimum_t = self.threshold
-        
-        while True: 
-            g1_sum = 0.0
-            g1_count = 0.0
-            
-            g2_sum = 0.0
-            g2_count = 0.0
-            
-            for i in range(img.shape[0]):
-                for j in range(img.shape[1]):
-                    if img[i][j] > optimum_t:
-                        g1_sum += img[i][j]
-                        g1_count += 1
-                    else:
-                        g2_sum += img[i][j]
-                        g2_count += 1
-                        
+
+        while True:
+            idx = min(int(np.floor(optimum_t)) - imin, hist.size - 1)
+
+            g2_count = cum_count[idx]
+            g2_sum = cum_sum[idx]
+            g1_count = cum_count[-1] - g2_count
+            g1_sum = cum_sum[-1] - g2_sum
+
             new_t = (g1_sum/g1_count + g2_sum/g2_count) / 2.0
             if new_t - optimum_t <= 0.5:
                 return new_t
@@ -101,16 +155,8 @@ class IMGFiltering:
         @return filtered image
         '''        
         optimum_t = self.find_optimum_threshold(img)
-        
-        new_img = np.copy(img)
-        for i in range(img.shape[0]):
-            for j in range(img.shape[1]):
-                if img[i][j] > optimum_t:
-                    new_img[i][j] = 1
-                else:
-                    new_img[i][j] = 0
-        
-        return new_img
+
+        return (img > optimum_t).astype(img.dtype)
 
 
 class LimiarFilter(IMGFiltering):
@@ -149,14 +195,9 @@ class Filter1D(IMGFiltering):
         @param img: image to be filtered
         @return filtered image
         '''
-        padding = int((self.size-1) / 2)
         img_1D = self.create_circular_array(img)
-        result = np.zeros((img.shape[0] * img.shape[1],))
-        
-        weights = np.flip(self.weights)
-        for k in range(padding, img.shape[0] * img.shape[1] + 1):
-            result[k-1] = sum(np.multiply(weights, img_1D[k-1:k+self.size-1]))
-            
+        result = np.convolve(img_1D, self.weights, mode='valid')
+
         return np.reshape(result, img.shape)
         
     def create_circular_array(self, img):
@@ -167,14 +208,8 @@ class Filter1D(IMGFiltering):
         @return 1D circular array with image
         ''' 
         padding = int((self.size-1) / 2)
-        aux = np.reshape(img, img.shape[0] * img.shape[1])
-        img_1D = np.zeros(img.shape[0] * img.shape[1] + 2 * padding)
-        
-        img_1D[padding:-padding] = aux
-        img_1D[0:padding] = aux[-padding:]
-        img_1D[-padding:] = aux[0:padding]
-        
-        return img_1D
+
+        return np.pad(img.ravel(), padding, mode='wrap')
 
 
 class LimiarFilter2D(IMGFiltering):
@@ -194,16 +229,22 @@ class LimiarFilter2D(IMGFiltering):
     def simple_filter(self, img):
         '''
         Applies convolution to the image with the specified weights
+
+        The accumulator dtype is the smallest integer type that can hold
+        sum(|weights|) * max(|pixel|), so uint8 inputs with small kernels
+        are convolved in int16 and move half the bytes of an int32 pass
         '''
-        img = img.astype(np.int32)
+        bound = np.sum(np.abs(self.weights)) * max(abs(int(np.min(img))), abs(int(np.max(img))))
+        acc_dtype = np.int16 if bound <= np.iinfo(np.int16).max else np.int32
+
+        img = img.astype(acc_dtype)
         new_img = np.copy(img)
         padding = int((self.size-1) / 2)
-        weights = np.flip(np.flip(self.weights, 0), 1)
-        
-        for i in range(padding, img.shape[0] - padding):
-            for j in range(padding, img.shape[1] - padding):
-                new_img[i][j] = np.sum(np.multiply(weights, img[i-padding:i+padding+1, j-padding:j+padding+1]))
-                
+        weights = np.flip(np.flip(self.weights, 0), 1).astype(acc_dtype)
+
+        windows = sliding_window_view(img, (self.size, self.size))
+        new_img[padding:-padding, padding:-padding] = np.einsum('ijkl,kl->ij', windows, weights)
+
         return new_img
         
     def apply_filter(self, img):
@@ -230,19 +271,10 @@ class MedianFilter2D(IMGFiltering):
         @param img: image to be filtered
         @return filtered image
         '''
-        padding = int((self.size-1) / 2)
-        
-        aux_img = np.zeros((img.shape[0] + 2 * padding, img.shape[1] + 2 * padding))
-        aux_img[padding:-padding, padding:-padding] = img
-        new_img = np.zeros((img.shape))
-        middle = int((self.size * self.size - 1)/2)
-        
-        for i in range(padding, img.shape[0] + 1):
-            for j in range(padding, img.shape[1] + 1):
-                neighborhood = aux_img[i-padding:i+padding+1, j-padding:j+padding+1]
-                new_img[i-padding][j-padding] = sorted(neighborhood.reshape(self.size * self.size))[middle]
-        
-        return new_img
+        if img.dtype == np.uint8:
+            return _median_filter_u8(img, self.size)
+
+        return ndimage.median_filter(img, size=self.size, mode='constant', cval=0)
 
 
 def run_filtering():